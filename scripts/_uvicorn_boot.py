@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Minimal uvicorn launcher used by run_demo_with_mock.py and run_facilitator_forever.py.
+
+Calls `uvicorn.run` directly, skipping the `python -m uvicorn` CLI layer (click parsing
+and entry-point resolution) on every (re)start.
+
+Usage:
+    python scripts/_uvicorn_boot.py TARGET HOST PORT LOG_LEVEL
+"""
+import os
+import sys
+from pathlib import Path
+
+# Resolve TARGET like `python -m uvicorn` would (cwd first), falling back to the repo root
+sys.path[:0] = [os.getcwd(), str(Path(__file__).resolve().parents[1])]
+
+
+if __name__ == '__main__':
+    from uvicorn import run
+
+    target, host, port, log_level = sys.argv[1:5]
+    run(target, host=host, port=int(port), log_level=log_level)
@@ -47,9 +47,9 @@ def start_mock():
 
 def wait_for_mock(timeout=10.0):
     import httpx
-    start = time.time()
+    start = time.monotonic()
     url = f"{MOCK_URL}/list"
-    while time.time() - start < timeout:
+    while time.monotonic() - start < timeout:
         try:
             r = httpx.get(url, timeout=2.0)
             if r.status_code == 200:
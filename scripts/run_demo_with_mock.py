@@ -2,8 +2,16 @@
 import subprocess
 import sys
 import os
+import asyncio
+import contextlib
+import importlib.util
+import inspect
+import io
+import traceback
 import time
 import signal
+import socket
+import threading
 import json
 import re
 from pathlib import Path
@@ -18,64 +26,193 @@ MOCK_PORT = 8000
 MOCK_URL = f"http://{MOCK_HOST}:{MOCK_PORT}"
 
 UVICORN_TARGET = "scripts.mock_facilitator:app"
+UVICORN_BOOT = ROOT / "scripts" / "_uvicorn_boot.py"
+DEMO_PATH = ROOT / "examples" / "x402_integration_demo.py"
+
+# Run the demo inside this process instead of a child interpreter (no per-run timeout)
+DEMO_IN_PROCESS = os.environ.get("DEMO_IN_PROCESS", "0") in ("1", "true", "True")
+
+# Readiness polling: truncated exponential backoff (25ms, 50ms, ... capped at 1s)
+READY_BACKOFF_INITIAL = 0.025
+READY_BACKOFF_MAX = 1.0
 
 # Dummy private key for demo; replace with secure test key if desired
 DUMMY_PRIVATE_KEY = os.environ.get("X402_PRIVATE_KEY", "0x0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef")
 
 
 def start_mock():
-    cmd = [sys.executable, "-m", "uvicorn", UVICORN_TARGET, "--host", MOCK_HOST, "--port", str(MOCK_PORT), "--log-level", "warning"]
+    cmd = [sys.executable, str(UVICORN_BOOT), UVICORN_TARGET, MOCK_HOST, str(MOCK_PORT), "warning"]
     # Start uvicorn as subprocess
     proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     return proc
 
 
+def port_open(host, port, timeout=0.1):
+    # Cheap TCP connect check so we only build an HTTP request once uvicorn is listening
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
 def wait_for_mock(timeout=10):
-    start = time.time()
-    url = f"{MOCK_URL}/list"
-    while time.time() - start < timeout:
-        try:
-            r = httpx.get(url, timeout=2.0)
-            if r.status_code == 200:
-                return True
-        except Exception:
-            pass
-        time.sleep(0.5)
+    start = time.monotonic()
+    delay = READY_BACKOFF_INITIAL
+    # One keep-alive client for all probes instead of a new connection per attempt
+    with httpx.Client(base_url=MOCK_URL, timeout=httpx.Timeout(2.0, connect=0.2)) as client:
+        while time.monotonic() - start < timeout:
+            if port_open(MOCK_HOST, MOCK_PORT):
+                try:
+                    r = client.get("/list")
+                    if r.status_code == 200:
+                        return True
+                except Exception:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, READY_BACKOFF_MAX)
     return False
 
 
-def run_demo(env=None, timeout=30):
-    cmd = [sys.executable, str(ROOT / "examples" / "x402_integration_demo.py")]
+def run_demo(env=None, timeout=30, on_json=None):
+    cmd = [sys.executable, str(DEMO_PATH)]
     env_copy = os.environ.copy()
     if env:
         env_copy.update(env)
-    p = subprocess.run(cmd, capture_output=True, text=True, env=env_copy, timeout=timeout)
-    return p
+    # Make the child flush per line so output reaches the log and parser as it is produced
+    env_copy["PYTHONUNBUFFERED"] = "1"
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, env=env_copy)
+    timed_out = []
 
+    def kill_on_timeout():
+        timed_out.append(True)
+        p.kill()
 
-def extract_json_objects(text):
+    timer = threading.Timer(timeout, kill_on_timeout)
+    timer.start()
+    json_objs = []
+    pending = ""
+
+    def emit(objs):
+        json_objs.extend(objs)
+        if on_json:
+            for obj in objs:
+                on_json(obj)
+
+    try:
+        # Tee output to the log and parse JSON as it arrives; only the unparsed tail is kept
+        with LOG_PATH.open("w") as log:
+            for line in p.stdout:
+                log.write(line)
+                if not pending and '{' not in line:
+                    # plain log line and no object in progress: nothing to keep or scan
+                    continue
+                pending += line
+                objs, consumed = scan_json_objects(pending, final=False)
+                emit(objs)
+                pending = pending[consumed:]
+            emit(extract_json_objects(pending))
+        p.wait()
+    finally:
+        timer.cancel()
+        p.stdout.close()
+    if timed_out:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return p.returncode, json_objs
+
+
+def _callable_without_args(fn):
+    # True if fn can be called as fn(), i.e. every parameter has a default or is *args/**kwargs
+    if not callable(fn):
+        return False
+    try:
+        params = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return all(
+        p.default is not p.empty or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+        for p in params
+    )
+
+
+def run_demo_in_process(env=None, on_json=None):
+    """Run the demo in this interpreter, capturing its output.
+
+    If the demo module exposes a run() that takes no required arguments, the list of
+    dicts it returns is used directly; otherwise main() is called and JSON is
+    extracted from the output.
+    """
+    old_env = os.environ.copy()
+    old_path = list(sys.path)
+    os.environ.update(env or {})
+    sys.path.insert(0, str(DEMO_PATH.parent))
+    buf = io.StringIO()
+    returncode = 0
+    result = None
+    try:
+        with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+            try:
+                spec = importlib.util.spec_from_file_location("x402_integration_demo", DEMO_PATH)
+                mod = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(mod)
+                run_fn = getattr(mod, "run", None)
+                if not _callable_without_args(run_fn):
+                    run_fn = None
+                entry = run_fn or getattr(mod, "main", None)
+                if entry is not None:
+                    out = entry()
+                    if inspect.isawaitable(out):
+                        out = asyncio.run(out)
+                    if entry is run_fn:
+                        result = out
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+    finally:
+        sys.path[:] = old_path
+        os.environ.clear()
+        os.environ.update(old_env)
+
+    output = buf.getvalue()
+    LOG_PATH.write_text(output)
+    json_objs = list(result) if result is not None else extract_json_objects(output)
+    if on_json:
+        for obj in json_objs:
+            on_json(obj)
+    return returncode, json_objs
+
+
+def scan_json_objects(text, final=True):
+    """Return (objects, consumed) for the JSON objects found in text.
+
+    With final=False an object cut off at the end of text is left unconsumed so
+    it can be retried once more output has been appended.
+    """
     objs = []
-    # Find JSON objects by searching for balanced braces
-    brace_stack = []
-    start_idx = None
-    for i, ch in enumerate(text):
-        if ch == '{':
-            if not brace_stack:
-                start_idx = i
-            brace_stack.append('{')
-        elif ch == '}':
-            if brace_stack:
-                brace_stack.pop()
-                if not brace_stack and start_idx is not None:
-                    candidate = text[start_idx:i+1]
-                    try:
-                        obj = json.loads(candidate)
-                        objs.append(obj)
-                    except Exception:
-                        # ignore non-json
-                        pass
-                    start_idx = None
-    return objs
+    # Let the C-level JSON scanner find object boundaries; braces inside strings are handled correctly
+    decoder = json.JSONDecoder()
+    i = 0
+    while True:
+        start = text.find('{', i)
+        if start < 0:
+            return objs, len(text)
+        try:
+            obj, end = decoder.raw_decode(text, start)
+        except ValueError as e:
+            if not final and getattr(e, "pos", -1) >= len(text):
+                # object is still being written
+                return objs, start
+            # not json at this brace, keep scanning
+            i = start + 1
+            continue
+        objs.append(obj)
+        i = end
+
+
+def extract_json_objects(text):
+    return scan_json_objects(text)[0]
 
 
 def main():
@@ -101,23 +238,28 @@ def main():
             "X402_PRIVATE_KEY": DUMMY_PRIVATE_KEY,
         }
         print("Running demo script...")
-        res = run_demo(env=env, timeout=60)
+        saved = []
 
-        LOG_PATH.write_text(res.stdout + '\n' + res.stderr)
+        def save_json(obj):
+            # persist each object as soon as the demo prints it, not after the demo exits
+            saved.append(obj)
+            LAST_TX_PATH.write_text(json.dumps(saved, indent=2))
+
+        if DEMO_IN_PROCESS:
+            returncode, json_objs = run_demo_in_process(env=env, on_json=save_json)
+        else:
+            returncode, json_objs = run_demo(env=env, timeout=60, on_json=save_json)
         print(f"Demo stdout/stderr written to {LOG_PATH}")
 
-        # extract JSON objects from stdout
-        json_objs = extract_json_objects(res.stdout)
         if json_objs:
-            LAST_TX_PATH.write_text(json.dumps(json_objs, indent=2))
             print(f"Extracted {len(json_objs)} JSON object(s) and saved to {LAST_TX_PATH}")
         else:
             print("No JSON objects extracted from demo output.")
 
         # return exit code
-        if res.returncode != 0:
-            print(f"Demo exited with code {res.returncode}")
-            sys.exit(res.returncode)
+        if returncode != 0:
+            print(f"Demo exited with code {returncode}")
+            sys.exit(returncode)
 
     finally:
         # Terminate uvicorn process
@@ -8,7 +8,7 @@ Usage (Windows cmd):
 This script will:
 - Start uvicorn serving `scripts.mock_facilitator:app` on 127.0.0.1:8000 (configurable via env)
 - Log stdout/stderr to `scripts/facilitator.log`
-- Restart the process if it exits unexpectedly
+- Restart the process if it exits unexpectedly, backing off exponentially (up to 60s) if it keeps crashing on startup
 - Open the default browser to the facilitator /list endpoint once when ready
 
 To run persistently across reboots, run this script inside a dedicated terminal or create a Windows Scheduled Task or service.
@@ -16,17 +16,20 @@ To run persistently across reboots, run this script inside a dedicated terminal
 from __future__ import annotations
 
 import os
+import socket
 import subprocess
 import sys
+import threading
 import time
 import webbrowser
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 ROOT = Path(__file__).resolve().parents[1]
 SCRIPTS = ROOT / "scripts"
 LOG_FILE = SCRIPTS / "facilitator.log"
 PID_FILE = SCRIPTS / "facilitator.pid"
+UVICORN_BOOT = SCRIPTS / "_uvicorn_boot.py"
 
 UVICORN_TARGET = os.environ.get("UVICORN_TARGET", "scripts.mock_facilitator:app")
 HOST = os.environ.get("MOCK_HOST", "127.0.0.1")
@@ -36,36 +39,84 @@ OPEN_BROWSER = os.environ.get("OPEN_FACILITATOR_BROWSER", "1") in ("1", "true",
 CHECK_URL = f"http://{HOST}:{PORT}/list"
 
 RESTART_DELAY = 2.0
+# Crash-loop backoff: runs shorter than FAST_FAIL_SECONDS double the restart delay (capped)
+RESTART_DELAY_MAX = 60.0
+FAST_FAIL_SECONDS = 5.0
+DRAIN_JOIN_TIMEOUT = 5.0
 
+# Readiness polling: truncated exponential backoff (25ms, 50ms, ... capped at 1s)
+READY_BACKOFF_INITIAL = 0.025
+READY_BACKOFF_MAX = 1.0
 
-def start_uvicorn_log() -> subprocess.Popen:
-    cmd = [sys.executable, "-m", "uvicorn", UVICORN_TARGET, "--host", HOST, "--port", str(PORT), "--log-level", "info"]
+
+def drain_to_log(stream, logfile) -> None:
+    # Copy child output to the log in chunks of up to 64KiB; closes the pipe and the log at EOF
+    try:
+        while True:
+            data = stream.read1(65536)
+            if not data:
+                break
+            logfile.write(data)
+            logfile.flush()
+    except (OSError, ValueError):
+        pass
+    finally:
+        stream.close()
+        logfile.close()
+
+
+def start_uvicorn_log() -> Tuple[subprocess.Popen, threading.Thread]:
+    cmd = [sys.executable, str(UVICORN_BOOT), UVICORN_TARGET, HOST, str(PORT), "info"]
     # Ensure scripts dir exists
     SCRIPTS.mkdir(parents=True, exist_ok=True)
-    logfile = open(LOG_FILE, "a", buffering=1, encoding="utf-8")
+    logfile = open(LOG_FILE, "ab")
     # write header
-    logfile.write(f"\n--- Starting uvicorn: {UVICORN_TARGET} host={HOST} port={PORT} at {time.ctime()} ---\n")
-    proc = subprocess.Popen(cmd, stdout=logfile, stderr=subprocess.STDOUT)
+    logfile.write(f"\n--- Starting uvicorn: {UVICORN_TARGET} host={HOST} port={PORT} at {time.ctime()} ---\n".encode("utf-8"))
+    logfile.flush()
+    # Child writes into a pipe we drain on a thread, so a slow log disk never blocks uvicorn;
+    # unbuffered so its logs reach the file as they happen rather than in block-sized bursts
+    env = os.environ.copy()
+    env["PYTHONUNBUFFERED"] = "1"
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+    drain = threading.Thread(target=drain_to_log, args=(proc.stdout, logfile), daemon=True)
+    drain.start()
     # write pid
     try:
         PID_FILE.write_text(str(proc.pid))
     except Exception:
         pass
-    return proc
+    return proc, drain
 
 
-def wait_for_ready(timeout: float = 10.0) -> bool:
+def port_open(host: str, port: int, timeout: float = 0.1) -> bool:
+    # Cheap TCP connect check so we only build an HTTP request once uvicorn is listening
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_ready(timeout: float = 10.0, proc: Optional[subprocess.Popen] = None) -> bool:
     import httpx
 
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            r = httpx.get(CHECK_URL, timeout=2.0)
-            if r.status_code == 200:
-                return True
-        except Exception:
-            pass
-        time.sleep(0.5)
+    start = time.monotonic()
+    delay = READY_BACKOFF_INITIAL
+    # One keep-alive client for all probes instead of a new connection per attempt
+    with httpx.Client(timeout=httpx.Timeout(2.0, connect=0.2)) as client:
+        while time.monotonic() - start < timeout:
+            if proc is not None and proc.poll() is not None:
+                # process already died; no point waiting out the timeout
+                return False
+            if port_open(HOST, PORT):
+                try:
+                    r = client.get(CHECK_URL)
+                    if r.status_code == 200:
+                        return True
+                except Exception:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, READY_BACKOFF_MAX)
     return False
 
 
@@ -80,10 +131,12 @@ def main():
     print(f"Starting facilitator launcher for {UVICORN_TARGET} on {HOST}:{PORT}")
     first_time = True
     proc: Optional[subprocess.Popen] = None
+    consecutive_fast_fails = 0
     try:
         while True:
-            proc = start_uvicorn_log()
-            ready = wait_for_ready(timeout=10.0)
+            last_start_time = time.monotonic()
+            proc, drain = start_uvicorn_log()
+            ready = wait_for_ready(timeout=10.0, proc=proc)
             if ready:
                 print(f"Facilitator is ready at {CHECK_URL}")
                 if OPEN_BROWSER and first_time:
@@ -95,7 +148,17 @@ def main():
             try:
                 proc.wait()
                 exit_code = proc.returncode
-                print(f"Facilitator process exited with code {exit_code}; restarting in {RESTART_DELAY}s...")
+                # let the last of the child's output reach the log before we report the exit;
+                # bounded in case a grandchild inherited the pipe and keeps it open
+                drain.join(timeout=DRAIN_JOIN_TIMEOUT)
+                if time.monotonic() - last_start_time < FAST_FAIL_SECONDS:
+                    consecutive_fast_fails += 1
+                else:
+                    consecutive_fast_fails = 0
+                delay = min(RESTART_DELAY * (2 ** consecutive_fast_fails), RESTART_DELAY_MAX)
+                if consecutive_fast_fails:
+                    print(f"Facilitator exited after less than {FAST_FAIL_SECONDS}s ({consecutive_fast_fails} in a row); backing off")
+                print(f"Facilitator process exited with code {exit_code}; restarting in {delay}s...")
             except KeyboardInterrupt:
                 print("Received KeyboardInterrupt, terminating facilitator process...")
                 try:
@@ -105,7 +168,8 @@ def main():
                 break
             except Exception as e:
                 print(f"Error waiting for process: {e}")
-            time.sleep(RESTART_DELAY)
+                delay = RESTART_DELAY
+            time.sleep(delay)
     finally:
         # cleanup
         try:
@@ -9,8 +9,13 @@ Usage (Windows cmd):
   set RECEIVER=0x...
   python scripts\send_solana_and_verify.py --amount 0.01 --token-type spl
 
-This script requires `solana` and `spl-token` python packages:
-  python -m pip install solana
+This script requires the `solana` (RPC client, spl-token) and `solders` (keys,
+instructions and transaction signing, Rust-backed) python packages:
+  python -m pip install "solana>=0.36" solders
+
+solana 0.36 is the first release whose Client keeps one pooled keep-alive httpx
+session for all RPC calls; older releases open a new connection per request.
+Releases before 0.35 also cannot send the solders Transaction built here.
 
 Notes:
 - For security, set `SOLANA_PRIVATE_KEY` locally only. Do NOT share it.
@@ -19,9 +24,12 @@ Notes:
 from __future__ import annotations
 import argparse
 import os
+import re
 import sys
 from typing import Optional
 
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential, wait_random
+
 
 def parse_args():
     p = argparse.ArgumentParser()
@@ -37,33 +45,80 @@ def parse_args():
 def lazy_imports():
     try:
         from solana.rpc.api import Client
-        from solana.keypair import Keypair
-        from solana.publickey import PublicKey
+        from solders.keypair import Keypair
+        from solders.pubkey import Pubkey
     except Exception:
-        print("Missing dependency: solana. Install with: python -m pip install solana")
+        print("Missing dependency: solana/solders. Install with: python -m pip install \"solana>=0.36\" solders")
         raise
-    return Client, Keypair, PublicKey
+    return Client, Keypair, Pubkey
+
+
+def is_transient_rpc_error(exc: BaseException) -> bool:
+    # solana-py wraps every httpx error in SolanaRpcException; the original is its __cause__
+    import httpx
+    from solana.exceptions import SolanaRpcException
+
+    cause = exc.__cause__ if isinstance(exc, SolanaRpcException) else exc
+    if isinstance(cause, httpx.HTTPStatusError):
+        return cause.response.status_code in (429, 503)
+    return isinstance(cause, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+# One shared retry policy: 5 attempts, exponential backoff from 0.2s capped at 8s plus up to 1s jitter
+RPC_RETRY = Retrying(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=0.2, max=8.0) + wait_random(0, 1),
+    retry=retry_if_exception(is_transient_rpc_error),
+    reraise=True,
+)
+
+
+def call_with_backoff(fn, *args, **kwargs):
+    # Retry transient failures (connection resets, timeouts, 429/503) with jittered
+    # exponential backoff; RPC errors are raised immediately.
+    return RPC_RETRY(fn, *args, **kwargs)
+
+
+# Error the node returns when it is sent a transaction it already processed
+ALREADY_PROCESSED_RE = re.compile(r"already (been )?processed|AlreadyProcessed", re.I)
+
+
+def send_signed_transaction(client, txn) -> str:
+    # The signature is known locally, so when a retry follows an attempt whose response was
+    # lost, the node's "already processed" rejection still means the transfer was sent
+    signature = str(txn.signatures[0])
+    try:
+        call_with_backoff(client.send_transaction, txn)
+    except Exception as e:
+        if not ALREADY_PROCESSED_RE.search(str(e)):
+            raise
+    return signature
+
+
+def get_lamports(client, pubkeys):
+    # All balances in one getMultipleAccounts round trip; a zero-length data slice skips
+    # account data, and accounts that do not exist yet hold 0 lamports
+    from solana.rpc.types import DataSliceOpts
+
+    resp = call_with_backoff(client.get_multiple_accounts, pubkeys, data_slice=DataSliceOpts(offset=0, length=0))
+    return [acc.lamports if acc is not None else 0 for acc in resp.value]
 
 
 def load_keypair(priv: str):
-    from solana.keypair import Keypair
+    from solders.keypair import Keypair
     import json
-    from base58 import b58decode
     s = priv.strip()
     if s.startswith('['):
         arr = json.loads(s)
-        return Keypair.from_secret_key(bytes(arr))
+        return Keypair.from_bytes(bytes(arr))
     else:
         try:
-            sk = b58decode(s)
-            return Keypair.from_secret_key(sk)
+            # base58 decoding happens in solders' native code
+            return Keypair.from_base58_string(s)
         except Exception:
-            # maybe hex seed
-            try:
-                seed = bytes.fromhex(s)
-                return Keypair.from_secret_key(seed)
-            except Exception as e:
-                raise
+            # maybe hex: a 32-byte seed or a 64-byte secret key
+            raw = bytes.fromhex(s)
+            return Keypair.from_seed(raw) if len(raw) == 32 else Keypair.from_bytes(raw)
 
 
 def main():
@@ -85,7 +140,7 @@ def main():
         print("Recipient address is required (set --to or RECEIVER env)")
         sys.exit(2)
 
-    Client, Keypair, PublicKey = lazy_imports()
+    Client, Keypair, Pubkey = lazy_imports()
     client = Client(rpc)
 
     try:
@@ -94,28 +149,33 @@ def main():
         print(f"Failed to load keypair: {e}")
         sys.exit(3)
 
-    from_addr = str(kp.public_key)
+    # decode each address once and reuse the Pubkey objects below
+    owner_pk = kp.pubkey()
+    to_pk = Pubkey.from_string(to)
+    from_addr = str(owner_pk)
     print(f"Using from address: {from_addr}")
 
     if token_type == 'sol':
-        bal_before = client.get_balance(PublicKey(from_addr))
-        bal_to_before = client.get_balance(PublicKey(to))
+        bal_before, bal_to_before = get_lamports(client, [owner_pk, to_pk])
         print('Balance before:', bal_before)
         print('Receiver balance before:', bal_to_before)
         lamports = int(float(amount_str) * 1e9)
-        tx = client.request_airdrop(PublicKey(from_addr), lamports) if False else None
+        tx = client.request_airdrop(owner_pk, lamports) if False else None
         # For safety, we won't request airdrop here. Instead build and send transfer
-        from solana.transaction import Transaction
-        from solana.system_program import TransferParams, transfer
-        txn = Transaction().add(transfer(TransferParams(from_pubkey=PublicKey(from_addr), to_pubkey=PublicKey(to), lamports=lamports)))
+        from solders.message import Message
+        from solders.system_program import TransferParams, transfer
+        from solders.transaction import Transaction
+        ix = transfer(TransferParams(from_pubkey=owner_pk, to_pubkey=to_pk, lamports=lamports))
         try:
-            resp = client.send_transaction(txn, kp)
-            print('Sent tx:', resp)
+            blockhash = call_with_backoff(client.get_latest_blockhash).value.blockhash
+            # Signed natively by solders against a fixed blockhash, so the signature is final
+            txn = Transaction([kp], Message([ix], owner_pk), blockhash)
+            signature = send_signed_transaction(client, txn)
+            print('Sent tx:', signature)
         except Exception as e:
             print('Send failed:', e)
             sys.exit(4)
-        bal_after = client.get_balance(PublicKey(from_addr))
-        bal_to_after = client.get_balance(PublicKey(to))
+        bal_after, bal_to_after = get_lamports(client, [owner_pk, to_pk])
         print('Balance after:', bal_after)
         print('Receiver balance after:', bal_to_after)
     else:
@@ -124,20 +184,23 @@ def main():
         from spl.token.constants import TOKEN_PROGRAM_ID
         from spl.token.instructions import get_associated_token_address
         from solana.rpc.commitment import Confirmed
-        mint = PublicKey(token)
-        token_client = Token(client, mint, TOKEN_PROGRAM_ID, kp)
+        if not token:
+            print("SPL token mint is required (set --token or SPL_TOKEN env)")
+            sys.exit(2)
+        mint_pk = Pubkey.from_string(token)
+        token_client = Token(client, mint_pk, TOKEN_PROGRAM_ID, kp)
         # Find or create associated token accounts and transfer
-        from_addr_ata = get_associated_token_address(PublicKey(from_addr), mint)
-        to_addr_ata = get_associated_token_address(PublicKey(to), mint)
+        from_addr_ata = get_associated_token_address(owner_pk, mint_pk)
+        to_addr_ata = get_associated_token_address(to_pk, mint_pk)
         print('From ATA:', from_addr_ata)
         print('To ATA:', to_addr_ata)
         # Fetch decimals
-        info = token_client.get_mint_info()
+        info = call_with_backoff(token_client.get_mint_info)
         decimals = info.decimals
         raw_amount = int(float(amount_str) * (10 ** decimals))
         print(f'Transferring {raw_amount} (raw units)')
         try:
-            res = token_client.transfer(from_addr_ata, to_addr_ata, kp.public_key, raw_amount, opts=Confirmed)
+            res = token_client.transfer(from_addr_ata, to_addr_ata, owner_pk, raw_amount, opts=Confirmed)
             print('Transfer response:', res)
         except Exception as e:
             print('SPL transfer failed:', e)
@@ -8,13 +8,15 @@ Usage (Windows cmd):
   set USDC_CONTRACT=0x...                             # test USDC contract on chosen network
   set RECEIVER=0x...                                  # merchant or recipient
   python scripts\send_usdc_and_verify.py --amount 0.01
+  python scripts\send_usdc_and_verify.py --amount 0.01 0.02 0.03   # three transfers, one batch
 
 Flags:
   --rpc RPC_URL       : override RPC_URL env variable
   --private-key KEY   : override PRIVATE_KEY env variable (not recommended)
   --token TOKEN       : ERC20 contract address (env USDC_CONTRACT)
   --to RECEIVER       : recipient address (env RECEIVER or ADDRESS)
-  --amount AMOUNT     : human amount, in token units (e.g. 0.01 for 0.01 USDC)
+  --amount AMOUNT ... : human amount(s), in token units (e.g. 0.01 for 0.01 USDC); several
+                        amounts send one transfer each, submitted in a single JSON-RPC batch
   --wait              : wait for tx confirmation (default True)
 
 Notes:
@@ -22,14 +24,23 @@ Notes:
     python -m pip install web3 eth-account
 - Always use a testnet and a test wallet with small funds.
 - The script will print balances before and after and the tx hash/receipt.
+- Balances are read through Multicall3 (one call for both addresses) when the
+  chain has it deployed; token decimals/symbol are cached in ~/.kolynia/erc20_meta.json.
 """
 from __future__ import annotations
 import argparse
+import json
 import os
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from pathlib import Path
 from typing import Optional
 
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential, wait_random
+
 
 def parse_args():
     p = argparse.ArgumentParser(description="Send ERC20 token and verify balances")
@@ -37,7 +48,7 @@ def parse_args():
     p.add_argument("--private-key", help="Private key hex (or set PRIVATE_KEY or X402_PRIVATE_KEY env)")
     p.add_argument("--token", help="ERC20 token contract address (or set USDC_CONTRACT env)")
     p.add_argument("--to", help="Recipient address (or set RECEIVER or ADDRESS env)")
-    p.add_argument("--amount", type=str, required=True, help="Amount in token units (human, e.g. 0.01)")
+    p.add_argument("--amount", type=str, nargs="+", required=True, help="Amount(s) in token units (human, e.g. 0.01); one transfer per amount")
     p.add_argument("--wait", action="store_true", help="Wait for tx confirmation (default: true)")
     return p.parse_args()
 
@@ -57,6 +68,77 @@ def lazy_web3_imports():
     return Web3, geth_poa_middleware, Account
 
 
+def make_rpc_session():
+    # One pooled keep-alive session for every JSON-RPC call. Retries are left to
+    # call_with_backoff so a request is never retried by two stacked layers.
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def is_transient_rpc_error(exc: BaseException) -> bool:
+    import requests
+
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code in (429, 503)
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError))
+
+
+# One shared retry policy: 5 attempts, exponential backoff from 0.2s capped at 8s plus up to 1s jitter
+RPC_RETRY = Retrying(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=0.2, max=8.0) + wait_random(0, 1),
+    retry=retry_if_exception(is_transient_rpc_error),
+    reraise=True,
+)
+
+
+def call_with_backoff(fn, *args, **kwargs):
+    # Retry transient failures (connection resets, timeouts, 429/503) with jittered exponential
+    # backoff; JSON-RPC errors such as reverts are raised immediately.
+    return RPC_RETRY(fn, *args, **kwargs)
+
+
+# Errors a node returns when it is sent a tx it already accepted
+ALREADY_KNOWN_RE = re.compile(r"already known|known transaction|already imported", re.I)
+
+
+def tx_exists(w3, tx_hash: str) -> bool:
+    from web3.exceptions import TransactionNotFound
+
+    try:
+        call_with_backoff(w3.eth.get_transaction, tx_hash)
+        return True
+    except TransactionNotFound:
+        return False
+
+
+def send_error_means_sent(w3, tx_hash: str, message: str) -> bool:
+    # A send rejected because the node already has this exact tx (e.g. a retry after a lost
+    # response) still counts as sent. "nonce too low" only does if the nonce was used by this
+    # tx's own hash rather than by some other tx.
+    if ALREADY_KNOWN_RE.search(message):
+        return True
+    return "nonce too low" in message.lower() and tx_exists(w3, tx_hash)
+
+
+def send_signed_tx(w3, signed) -> str:
+    # The hash is taken from the signed tx, so a duplicate rejection can be matched to it
+    tx_hash = w3.to_hex(signed.hash)
+    try:
+        call_with_backoff(w3.eth.send_raw_transaction, signed.rawTransaction)
+    except ValueError as e:
+        if send_error_means_sent(w3, tx_hash, str(e)):
+            return tx_hash
+        raise
+    return tx_hash
+
+
 ERC20_ABI = [
     {"constant": True, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf", "outputs": [{"name": "balance", "type": "uint256"}], "type": "function"},
     {"constant": True, "inputs": [], "name": "decimals", "outputs": [{"name": "", "type": "uint8"}], "type": "function"},
@@ -64,14 +146,198 @@ ERC20_ABI = [
     {"constant": False, "inputs": [{"name": "_to", "type": "address"}, {"name": "_value", "type": "uint256"}], "name": "transfer", "outputs": [{"name": "", "type": "bool"}], "type": "function"},
 ]
 
+# keccak256("transfer(address,uint256)")[:4]
+TRANSFER_SELECTOR = bytes.fromhex("a9059cbb")
+
+# Multicall3 is deployed at the same address on most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ABI = [
+    {"inputs": [{"components": [{"name": "target", "type": "address"}, {"name": "callData", "type": "bytes"}], "name": "calls", "type": "tuple[]"}], "name": "aggregate", "outputs": [{"name": "blockNumber", "type": "uint256"}, {"name": "returnData", "type": "bytes[]"}], "stateMutability": "payable", "type": "function"},
+]
+
+ERC20_META_CACHE = Path.home() / ".kolynia" / "erc20_meta.json"
+
+# chain_id never changes for an endpoint; fetch it once per process
+_CHAIN_ID_CACHE: dict = {}
+
+
+def get_chain_id(w3, rpc: str) -> int:
+    if rpc not in _CHAIN_ID_CACHE:
+        _CHAIN_ID_CACHE[rpc] = call_with_backoff(lambda: w3.eth.chain_id)
+    return _CHAIN_ID_CACHE[rpc]
+
+
+def read_balances(w3, token, owners):
+    # One eth_call for all owners via Multicall3; fall back to one call per owner
+    try:
+        multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        token_address, encode = token.address, token.encodeABI
+        calls = [(token_address, encode(fn_name="balanceOf", args=[owner])) for owner in owners]
+        _, results = call_with_backoff(multicall.functions.aggregate(calls).call)
+        return [w3.codec.decode(["uint256"], r)[0] for r in results]
+    except Exception:
+        balance_of = token.functions.balanceOf
+        return [call_with_backoff(balance_of(owner).call) for owner in owners]
+
+
+def load_token_meta(chain_id: int, token):
+    key = f"{chain_id}:{token.address.lower()}"
+    try:
+        cache = json.loads(ERC20_META_CACHE.read_text())
+    except Exception:
+        cache = {}
+    meta = cache.get(key)
+    if meta:
+        return meta["decimals"], meta["symbol"]
+
+    cacheable = True
+    try:
+        decimals = call_with_backoff(token.functions.decimals().call)
+    except Exception:
+        decimals = 18
+        cacheable = False
+    try:
+        symbol = call_with_backoff(token.functions.symbol().call)
+    except Exception:
+        symbol = "TOKEN"
+        cacheable = False
+
+    if cacheable:
+        cache[key] = {"decimals": decimals, "symbol": symbol}
+        try:
+            ERC20_META_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            ERC20_META_CACHE.write_text(json.dumps(cache, indent=2))
+        except Exception:
+            pass
+    return decimals, symbol
+
+
+def suggest_fees(w3) -> dict:
+    # EIP-1559 fees from recent blocks; legacy gasPrice on chains without fee history
+    try:
+        hist = call_with_backoff(w3.eth.fee_history, 5, "latest", [50])
+        base = hist["baseFeePerGas"][-1]
+        tip = max(hist["reward"][-1][0], w3.to_wei(1, "gwei"))
+        return {"maxFeePerGas": 2 * base + tip, "maxPriorityFeePerGas": tip}
+    except Exception:
+        return {"gasPrice": call_with_backoff(lambda: w3.eth.gas_price)}
+
+
+def transfer_calldata(to: str, amount_raw: int) -> str:
+    # ABI-encode transfer(address,uint256) directly instead of going through the contract proxy
+    from eth_abi import encode
+
+    return "0x" + (TRANSFER_SELECTOR + encode(["address", "uint256"], [to, amount_raw])).hex()
+
+
+def estimate_transfer_gas(w3, from_addr: str, token_addr: str, data: str) -> int:
+    try:
+        return call_with_backoff(w3.eth.estimate_gas, {"from": from_addr, "to": token_addr, "data": data})
+    except Exception:
+        return 200000
+
+
+# Total time to wait for all receipts of one run
+RECEIPT_TIMEOUT = 120.0
+
+
+def wait_for_receipt(
+    w3,
+    tx_hash,
+    timeout: float = 120.0,
+    max_dropped_checks: int = 3,
+    drop_check_every: int = 3,
+    drop_grace: float = 30.0,
+):
+    # Poll with truncated exponential backoff (0.5s doubling to 5s) rather than web3's fixed 0.1s.
+    # Returns None on timeout or once the tx has gone missing from the node. Load-balanced RPCs
+    # often don't show a just-sent tx yet, so misses only count after the tx has been seen once
+    # or drop_grace seconds have passed, and the lookup runs only every few polls.
+    from web3.exceptions import TransactionNotFound
+
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = 0.5
+    polls = 0
+    seen = False
+    missing = 0
+    while time.monotonic() < deadline:
+        try:
+            return call_with_backoff(w3.eth.get_transaction_receipt, tx_hash)
+        except TransactionNotFound:
+            pass
+        polls += 1
+        if polls % drop_check_every == 0:
+            if tx_exists(w3, tx_hash):
+                seen = True
+                missing = 0
+            elif seen or time.monotonic() - start >= drop_grace:
+                missing += 1
+                if missing >= max_dropped_checks:
+                    print("Transaction is no longer known to the node (dropped from mempool?)")
+                    return None
+        time.sleep(delay)
+        delay = min(delay * 2, 5.0)
+    print(f"Timed out after {timeout:.0f}s waiting for receipt")
+    return None
+
+
+def try_send_signed_tx(w3, signed):
+    # (tx_hash, error) for one tx; error is None once the node has accepted it
+    tx_hash = w3.to_hex(signed.hash)
+    try:
+        return send_signed_tx(w3, signed), None
+    except Exception as e:
+        return tx_hash, str(e)
+
+
+def send_raw_batch(w3, session, rpc: str, signed_txs) -> list:
+    # Submit signed txs in one JSON-RPC batch (a single HTTP round trip). Returns (tx_hash, error)
+    # per tx, error None when accepted, so one rejected item doesn't hide the ones already broadcast.
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": "eth_sendRawTransaction", "params": [w3.to_hex(signed.rawTransaction)]}
+        for i, signed in enumerate(signed_txs)
+    ]
+    hashes = [w3.to_hex(signed.hash) for signed in signed_txs]
+
+    def post():
+        resp = session.post(rpc, json=payload, timeout=30)
+        resp.raise_for_status()
+        return resp.json()
+
+    try:
+        body = call_with_backoff(post)
+    except Exception as e:
+        return [(tx_hash, f"batch request failed: {e}") for tx_hash in hashes]
+    if not isinstance(body, list):
+        # provider does not support batches; send one at a time
+        return [try_send_signed_tx(w3, signed) for signed in signed_txs]
+    by_id = {item.get("id"): item for item in body}
+    results = []
+    for i, tx_hash in enumerate(hashes):
+        item = by_id.get(i, {})
+        if "result" in item:
+            results.append((tx_hash, None))
+            continue
+        error = item.get("error")
+        if error is None:
+            results.append((tx_hash, "no result"))
+            continue
+        message = str(error.get("message", error)) if isinstance(error, dict) else str(error)
+        # a retried batch may re-send txs the node had already accepted
+        results.append((tx_hash, None if send_error_means_sent(w3, tx_hash, message) else message))
+    return results
+
 
 def format_amount(raw: int, decimals: int) -> Decimal:
+    # Division (not scaleb) so the printed value drops trailing zeros: 0, 1, 0.5
     return Decimal(raw) / (Decimal(10) ** decimals)
 
 
 def parse_amount(amount_str: str, decimals: int) -> int:
     d = Decimal(amount_str)
-    raw = int(d * (Decimal(10) ** decimals))
+    # scaleb shifts the exponent directly instead of computing Decimal(10) ** decimals
+    raw = int(d.scaleb(decimals))
     return raw
 
 
@@ -81,7 +347,7 @@ def main():
     priv = args.private_key or os.getenv("PRIVATE_KEY") or os.getenv("X402_PRIVATE_KEY")
     token_addr = args.token or os.getenv("USDC_CONTRACT")
     to_addr = args.to or os.getenv("RECEIVER") or os.getenv("ADDRESS")
-    amount_str = args.amount
+    amount_strs = args.amount
     wait = args.wait or True
 
     if not rpc:
@@ -98,7 +364,8 @@ def main():
         sys.exit(2)
 
     Web3, geth_poa_middleware, Account = lazy_web3_imports()
-    w3 = Web3(Web3.HTTPProvider(rpc))
+    session = make_rpc_session()
+    w3 = Web3(Web3.HTTPProvider(rpc, session=session))
     # Some testnets require PoA middleware
     try:
         w3.middleware_onion.inject(geth_poa_middleware, layer=0)
@@ -113,21 +380,20 @@ def main():
     from_addr = acct.address
     print(f"Using from address: {from_addr}")
 
+    # checksum each address once (keccak over the hex string) and reuse everywhere
+    from_cs = w3.to_checksum_address(from_addr)
+    to_cs = w3.to_checksum_address(to_addr)
+    token_cs = w3.to_checksum_address(token_addr)
+    owners = [from_cs, to_cs]
+
     # token contract
-    token = w3.eth.contract(address=w3.to_checksum_address(token_addr), abi=ERC20_ABI)
-    try:
-        decimals = token.functions.decimals().call()
-    except Exception:
-        decimals = 18
-    try:
-        symbol = token.functions.symbol().call()
-    except Exception:
-        symbol = "TOKEN"
+    chain_id = get_chain_id(w3, rpc)
+    token = w3.eth.contract(address=token_cs, abi=ERC20_ABI)
+    decimals, symbol = load_token_meta(chain_id, token)
 
     # balances before
     try:
-        raw_from_before = token.functions.balanceOf(w3.to_checksum_address(from_addr)).call()
-        raw_to_before = token.functions.balanceOf(w3.to_checksum_address(to_addr)).call()
+        raw_from_before, raw_to_before = read_balances(w3, token, owners)
     except Exception as e:
         print(f"Error reading balances: {e}")
         sys.exit(4)
@@ -135,43 +401,75 @@ def main():
     print(f"Balance before - {from_addr}: {format_amount(raw_from_before, decimals)} {symbol}")
     print(f"Balance before - {to_addr}: {format_amount(raw_to_before, decimals)} {symbol}")
 
-    amount_raw = parse_amount(amount_str, decimals)
-    if amount_raw <= 0:
+    amounts_raw = [parse_amount(a, decimals) for a in amount_strs]
+    if any(a <= 0 for a in amounts_raw):
         print("Invalid amount")
         sys.exit(2)
+    # gas is only estimated for the largest transfer, so check the whole batch is covered
+    # before signing rather than letting later transfers revert on-chain
+    total_raw = sum(amounts_raw)
+    if total_raw > raw_from_before:
+        print(f"Insufficient balance: sending {format_amount(total_raw, decimals)} {symbol} but only {format_amount(raw_from_before, decimals)} {symbol} available")
+        sys.exit(2)
 
-    # build tx
-    chain_id = w3.eth.chain_id
-    nonce = w3.eth.get_transaction_count(from_addr)
-    tx = token.functions.transfer(w3.to_checksum_address(to_addr), amount_raw).build_transaction({
-        "chainId": chain_id,
-        "nonce": nonce,
-        "gas": 200000,
-        # gasPrice left for provider to suggest; we'll fetch gasPrice
-    })
-
-    try:
-        gas_price = w3.eth.gas_price
-        tx["gasPrice"] = gas_price
-    except Exception:
-        pass
+    # build txs; every transfer has the same shape, so one estimate (largest amount) covers all
+    # nonce, fees and gas are independent lookups; overlap their round trips
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        # "pending" so locally assigned nonces don't collide with txs still in flight
+        nonce_f = ex.submit(call_with_backoff, w3.eth.get_transaction_count, from_cs, "pending")
+        fees_f = ex.submit(suggest_fees, w3)
+        gas_f = ex.submit(estimate_transfer_gas, w3, from_cs, token_cs, transfer_calldata(to_cs, max(amounts_raw)))
+    fees, gas = fees_f.result(), gas_f.result()
+    if "maxFeePerGas" in fees:
+        fees = {**fees, "type": 2}
+    # nonces N, N+1, ... are assigned locally so the whole batch can be signed up front;
+    # tx dicts are built directly since every field is already known
+    txs = [
+        {
+            "to": token_cs,
+            "data": transfer_calldata(to_cs, amount_raw),
+            "value": 0,
+            "gas": gas,
+            "nonce": nonce,
+            "chainId": chain_id,
+            **fees,
+        }
+        for nonce, amount_raw in enumerate(amounts_raw, start=nonce_f.result())
+    ]
 
     # sign and send
-    signed = Account.sign_transaction(tx, priv)
-    tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
-    print(f"Sent transfer tx: {w3.to_hex(tx_hash)}")
-
-    if wait:
-        print("Waiting for confirmation...")
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-        print("Receipt:", receipt)
+    with ThreadPoolExecutor() as ex:
+        signed = list(ex.map(lambda tx: Account.sign_transaction(tx, priv), txs))
+    if len(signed) == 1:
+        results = [try_send_signed_tx(w3, signed[0])]
     else:
-        receipt = None
+        results = send_raw_batch(w3, session, rpc, signed)
+    failed = [(i, tx_hash, error) for i, (tx_hash, error) in enumerate(results) if error is not None]
+    # nonces are sequential, so txs accepted after the first failed one can't be mined until
+    # that nonce is filled; they stay queued on the node and are not waited on
+    first_failed = failed[0][0] if failed else len(results)
+    tx_hashes = [tx_hash for tx_hash, _ in results[:first_failed]]
+    stuck = [(i, tx_hash) for i, (tx_hash, error) in enumerate(results) if i > first_failed and error is None]
+    for tx_hash in tx_hashes:
+        print(f"Sent transfer tx: {tx_hash}")
+    for i, tx_hash, error in failed:
+        print(f"Failed to send transfer #{i} ({tx_hash}): {error}")
+    for i, tx_hash in stuck:
+        print(f"Transfer #{i} ({tx_hash}) is stuck behind the nonce gap at #{first_failed}; it stays queued until that nonce is used")
+
+    receipts = []
+    if wait and tx_hashes:
+        print("Waiting for confirmation...")
+        # one deadline for the whole batch; the txs mine together, so later waits are usually short
+        deadline = time.monotonic() + RECEIPT_TIMEOUT
+        for tx_hash in tx_hashes:
+            receipt = wait_for_receipt(w3, tx_hash, timeout=max(deadline - time.monotonic(), 0.0))
+            print("Receipt:", receipt)
+            receipts.append(receipt)
 
     # balances after
     try:
-        raw_from_after = token.functions.balanceOf(w3.to_checksum_address(from_addr)).call()
-        raw_to_after = token.functions.balanceOf(w3.to_checksum_address(to_addr)).call()
+        raw_from_after, raw_to_after = read_balances(w3, token, owners)
     except Exception as e:
         print(f"Error reading balances after tx: {e}")
         sys.exit(4)
@@ -184,8 +482,13 @@ def main():
     print(f"Deducted (raw units): {deducted}; received (raw units): {received}")
     print(f"Deducted (human): {format_amount(deducted, decimals)} {symbol}; Received: {format_amount(received, decimals)} {symbol}")
 
-    if receipt and receipt.get("status", 0) == 1:
-        print("Transfer succeeded")
+    if failed:
+        print(f"{len(failed)} of {len(results)} transfer(s) were not sent: {', '.join(f'#{i}' for i, _, _ in failed)}")
+        if stuck:
+            print(f"{len(stuck)} transfer(s) are queued behind the nonce gap: {', '.join(f'#{i}' for i, _ in stuck)}")
+        sys.exit(5)
+    if receipts and all(r and r.get("status", 0) == 1 for r in receipts):
+        print("Transfer succeeded" if len(receipts) == 1 else f"All {len(receipts)} transfers succeeded")
         sys.exit(0)
     else:
         print("Transfer may have failed or is pending")
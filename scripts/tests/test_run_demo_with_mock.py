@@ -0,0 +1,146 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import run_demo_with_mock as demo  # noqa: E402
+
+
+def test_scan_pretty_printed_object():
+    text = "log line\n" + json.dumps({"a": 1, "b": [1, 2]}, indent=2) + "\ntail\n"
+    objs, consumed = demo.scan_json_objects(text, final=False)
+    assert objs == [{"a": 1, "b": [1, 2]}]
+    assert consumed == len(text)
+
+
+def test_scan_braces_inside_strings():
+    text = 'x {"a": "}{", "b": {"c": "{"}} y {"d": 2}\n'
+    assert demo.extract_json_objects(text) == [
+        {"a": "}{", "b": {"c": "{"}},
+        {"d": 2},
+    ]
+
+
+def test_scan_skips_stray_brace():
+    text = 'start {bogus}\nthen {\nand {"ok": true}\n'
+    assert demo.extract_json_objects(text) == [{"ok": True}]
+
+
+def test_scan_truncated_trailing_object_left_pending():
+    head = '{"done": 1}\nnoise\n'
+    tail = '{\n  "a": 1,\n  "b": [\n'
+    objs, consumed = demo.scan_json_objects(head + tail, final=False)
+    assert objs == [{"done": 1}]
+    assert (head + tail)[consumed:] == tail
+
+    # once the rest arrives the pending object decodes
+    rest = tail + '    2\n  ]\n}\n'
+    objs, consumed = demo.scan_json_objects(rest, final=False)
+    assert objs == [{"a": 1, "b": [2]}]
+    assert consumed == len(rest)
+
+
+def test_scan_truncated_trailing_object_dropped_when_final():
+    text = '{"done": 1}\n{"a": 1,\n'
+    objs, consumed = demo.scan_json_objects(text, final=True)
+    assert objs == [{"done": 1}]
+    assert consumed == len(text)
+
+
+def _write_demo(tmp_path, monkeypatch, body):
+    script = tmp_path / "demo.py"
+    script.write_text(body)
+    monkeypatch.setattr(demo, "DEMO_PATH", script)
+    monkeypatch.setattr(demo, "LOG_PATH", tmp_path / "demo_result.log")
+
+
+def test_run_demo_streams_objects(tmp_path, monkeypatch):
+    _write_demo(
+        tmp_path,
+        monkeypatch,
+        "import json\n"
+        "print('start {bogus}')\n"
+        "print(json.dumps({'a': '}{'}, indent=2))\n"
+        "print('x', json.dumps({'c': 3}))\n",
+    )
+    seen = []
+    returncode, objs = demo.run_demo(timeout=30, on_json=seen.append)
+    assert returncode == 0
+    assert objs == [{"a": "}{"}, {"c": 3}]
+    assert seen == objs
+    assert "start {bogus}" in (tmp_path / "demo_result.log").read_text()
+
+
+def test_run_demo_timeout(tmp_path, monkeypatch):
+    _write_demo(
+        tmp_path,
+        monkeypatch,
+        "import time\nprint('waiting', flush=True)\ntime.sleep(30)\n",
+    )
+    with pytest.raises(subprocess.TimeoutExpired):
+        demo.run_demo(timeout=0.5)
+    assert "waiting" in (tmp_path / "demo_result.log").read_text()
+
+
+def test_run_demo_in_process_uses_run_result(tmp_path, monkeypatch):
+    _write_demo(
+        tmp_path,
+        monkeypatch,
+        "def run(verbose=False):\n"
+        "    print('not json {')\n"
+        "    return [{'step': 1}, {'step': 2}]\n"
+        "def main():\n"
+        "    raise AssertionError('main should not be called')\n",
+    )
+    seen = []
+    returncode, objs = demo.run_demo_in_process(on_json=seen.append)
+    assert returncode == 0
+    assert objs == [{"step": 1}, {"step": 2}]
+    assert seen == objs
+
+
+def test_run_demo_in_process_falls_back_to_main_on_exit(tmp_path, monkeypatch):
+    _write_demo(
+        tmp_path,
+        monkeypatch,
+        "import json, sys\n"
+        "def run(client):\n"
+        "    raise AssertionError('run needs an argument and should be skipped')\n"
+        "def main():\n"
+        "    print(json.dumps({'a': 1}, indent=2))\n"
+        "    print('x', json.dumps({'b': 2}))\n"
+        "    sys.exit(3)\n",
+    )
+    returncode, objs = demo.run_demo_in_process()
+    assert returncode == 3
+    assert objs == [{"a": 1}, {"b": 2}]
+    assert '"b": 2' in (tmp_path / "demo_result.log").read_text()
+
+
+def test_run_demo_in_process_restores_env_and_path(tmp_path, monkeypatch):
+    _write_demo(
+        tmp_path,
+        monkeypatch,
+        "import os, sys\n"
+        "os.environ['DEMO_SET_BY_SCRIPT'] = '1'\n"
+        "del os.environ['DEMO_PRESET']\n"
+        "sys.path.append('/demo-added')\n"
+        "def main():\n"
+        "    raise RuntimeError('boom')\n",
+    )
+    monkeypatch.setenv("DEMO_PRESET", "keep")
+    monkeypatch.delenv("DEMO_SET_BY_SCRIPT", raising=False)
+    monkeypatch.delenv("DEMO_PASSED_IN", raising=False)
+    env_before = dict(os.environ)
+    path_before = list(sys.path)
+
+    returncode, objs = demo.run_demo_in_process(env={"DEMO_PASSED_IN": "x"})
+    assert returncode == 1
+    assert objs == []
+    assert dict(os.environ) == env_before
+    assert sys.path == path_before
@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from send_usdc_and_verify import (  # noqa: E402
+    format_amount,
+    parse_amount,
+    send_raw_batch,
+)
+
+
+@pytest.mark.parametrize(
+    "raw, decimals, expected",
+    [
+        (0, 18, "0"),
+        (0, 6, "0"),
+        (1_000_000, 6, "1"),
+        (5 * 10**17, 18, "0.5"),
+        (1_234_567, 6, "1.234567"),
+        (-10_000, 6, "-0.01"),
+    ],
+)
+def test_format_amount(raw, decimals, expected):
+    assert str(format_amount(raw, decimals)) == expected
+
+
+@pytest.mark.parametrize(
+    "amount, decimals, expected",
+    [
+        ("0.01", 6, 10_000),
+        ("1", 6, 1_000_000),
+        ("3", 18, 3 * 10**18),
+        ("0.5", 18, 5 * 10**17),
+        # precision beyond the token's decimals is truncated
+        ("1.0000001", 6, 1_000_000),
+    ],
+)
+def test_parse_amount(amount, decimals, expected):
+    assert parse_amount(amount, decimals) == expected
+
+
+def test_round_trip():
+    assert parse_amount(str(format_amount(1_234_567, 6)), 6) == 1_234_567
+
+
+class FakeSession:
+    def __init__(self, body):
+        self.body = body
+
+    def post(self, url, json, timeout):
+        self.payload = json
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: self.body)
+
+
+def test_send_raw_batch_reports_each_item():
+    w3 = SimpleNamespace(to_hex=lambda b: "0x" + b.hex())
+    signed = [
+        SimpleNamespace(hash=bytes([i]), rawTransaction=bytes([0xF0 + i]))
+        for i in range(3)
+    ]
+    session = FakeSession(
+        [
+            {"jsonrpc": "2.0", "id": 2, "error": {"message": "already known"}},
+            {"jsonrpc": "2.0", "id": 0, "result": "0x00"},
+            {"jsonrpc": "2.0", "id": 1, "error": {"message": "insufficient funds"}},
+        ]
+    )
+    results = send_raw_batch(w3, session, "http://rpc", signed)
+    assert [p["params"] for p in session.payload] == [["0xf0"], ["0xf1"], ["0xf2"]]
+    assert results[0] == ("0x00", None)
+    assert results[1][0] == "0x01"
+    assert "insufficient funds" in results[1][1]
+    # a duplicate of an already accepted tx counts as sent
+    assert results[2] == ("0x02", None)
+
+
+def test_send_raw_batch_nonce_too_low_for_own_tx_counts_as_sent():
+    from web3.exceptions import TransactionNotFound
+
+    def get_transaction(tx_hash):
+        # only tx 0 reached the node before the response was lost
+        if tx_hash == "0x00":
+            return {"hash": tx_hash}
+        raise TransactionNotFound(tx_hash)
+
+    w3 = SimpleNamespace(
+        to_hex=lambda b: "0x" + b.hex(),
+        eth=SimpleNamespace(get_transaction=get_transaction),
+    )
+    signed = [
+        SimpleNamespace(hash=bytes([i]), rawTransaction=bytes([0xF0 + i]))
+        for i in range(2)
+    ]
+    session = FakeSession(
+        [
+            {"jsonrpc": "2.0", "id": 0, "error": {"code": -32000, "message": "nonce too low"}},
+            {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "nonce too low"}},
+        ]
+    )
+    results = send_raw_batch(w3, session, "http://rpc", signed)
+    assert results[0] == ("0x00", None)
+    # the nonce was used by some other tx, so this one was not sent
+    assert results[1] == ("0x01", "nonce too low")